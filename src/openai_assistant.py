@@ -1,19 +1,23 @@
 import asyncio
 import logging
 import os
+import time
+from collections import OrderedDict
 from pathlib import Path
-from tempfile import gettempdir
-from typing import AsyncGenerator, Optional
+from typing import AsyncGenerator, BinaryIO, Optional, Union
 
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
 from openai.types import FileObject
 
-from s3_uploader import S3Uploader
+from s3_uploader import AsyncIteratorReader, S3Uploader
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+URL_CACHE_SIZE = 256
+URL_CACHE_TTL = S3Uploader.URL_EXPIRES_IN - 300
+
 
 class OpenAIAssistant:
     def __init__(
@@ -22,8 +26,18 @@ class OpenAIAssistant:
         self.client = AsyncOpenAI()
         self.assistant_id = assistant_id
         self.thread_id = thread_id
+        self._thread_initialized = False
         self.uploaded_file: Optional[FileObject] = None
+        self._attachments: Optional[list] = None
         self.stream_tool_outputs = stream_tool_outputs
+        self._download_semaphore = asyncio.Semaphore(8)
+        self._url_cache: OrderedDict[str, tuple[str, str, float]] = OrderedDict()
+        self._handlers = {
+            "thread.message.delta": self._handle_message_delta,
+            "thread.message.completed": self._handle_message_completed,
+        }
+        if stream_tool_outputs:
+            self._handlers["thread.run.step.delta"] = self._handle_step_delta
         self.s3_uploader = S3Uploader(
             os.getenv("AWS_ACCESS_KEY_ID"),
             os.getenv("AWS_SECRET_ACCESS_KEY"),
@@ -32,21 +46,29 @@ class OpenAIAssistant:
         )
 
     async def _initialize_thread(self) -> None:
+        if self._thread_initialized:
+            return
         if self.thread_id:
-            logger.info(f"Retrieving thread: {self.thread_id}")
+            logger.info("Retrieving thread: %s", self.thread_id)
             await self.client.beta.threads.retrieve(thread_id=self.thread_id)
         else:
             logger.info("Creating new thread")
             thread = await self.client.beta.threads.create()
             self.thread_id = thread.id
-            logger.info(f"New thread created: {self.thread_id}")
+            logger.info("New thread created: %s", self.thread_id)
+        self._thread_initialized = True
 
     async def upload_file(self, file_path: str) -> FileObject:
-        logger.info(f"Uploading file: {file_path}")
-        with open(file_path, "rb") as file:
-            response = await self.client.files.create(file=file, purpose="assistants")
-        logger.info(f"File uploaded: {response.id}")
+        logger.info("Uploading file: %s", file_path)
+        data = await asyncio.to_thread(Path(file_path).read_bytes)
+        response = await self.client.files.create(
+            file=(Path(file_path).name, data), purpose="assistants"
+        )
+        logger.info("File uploaded: %s", response.id)
         self.uploaded_file = response
+        self._attachments = [
+            {"file_id": response.id, "tools": [{"type": "code_interpreter"}]}
+        ]
         return response
 
     async def chat(self, user_input: str) -> AsyncGenerator[str, None]:
@@ -56,14 +78,9 @@ class OpenAIAssistant:
             "role": "user",
             "content": user_input,
         }
-        if self.uploaded_file:
-            message_params["attachments"] = [
-                {
-                    "file_id": self.uploaded_file.id,
-                    "tools": [{"type": "code_interpreter"}],
-                }
-            ]
-        logger.info(f"Adding user message to thread: {user_input}")
+        if self._attachments:
+            message_params["attachments"] = self._attachments
+        logger.info("Adding user message to thread: %s", user_input)
         await self.client.beta.threads.messages.create(**message_params)
         logger.info("Sending user message to assistant")
         stream = await self.client.beta.threads.runs.create(
@@ -71,61 +88,102 @@ class OpenAIAssistant:
         )
         logger.info("Receiving assistant messages")
         async for event in stream:
-            if event.event == "thread.message.delta":
-                if event.data.delta.content:
-                    for content in event.data.delta.content:
-                        if content.type == "text":
-                            yield content.text.value
-            elif event.event == "thread.run.step.delta" and self.stream_tool_outputs:
-                if event.data.delta.step_details:
-                    step_details = event.data.delta.step_details
-                    if step_details.type == "tool_calls":
-                        for tool_call in step_details.tool_calls:
-                            if tool_call.type == "code_interpreter":
-                                if tool_call.code_interpreter.input:
-                                    if self.stream_tool_outputs:
-                                        yield tool_call.code_interpreter.input
-                                if tool_call.code_interpreter.outputs:
-                                    for output in tool_call.code_interpreter.outputs:
-                                        if output.type == "logs":
-                                            print(output.logs, end="", flush=True)
-                                        else:
-                                            logger.info(f"Output: {output.value}")
-            elif event.event == "thread.message.completed":
-                message = event.data
-                for content_block in message.content:
-                    if content_block.text.annotations:
-                        for annotation in content_block.text.annotations:
-                            object_name = annotation.text.split("/")[-1]
-                            if annotation.type == "file_path":
-                                yield await self._create_s3_download_url(
-                                    annotation.file_path.file_id, object_name
-                                )
-                            elif annotation.type == "file":
-                                yield await self._create_s3_download_url(
-                                    annotation.file_id, object_name
-                                )
-
-    async def _upload_to_s3(self, file_path: str) -> str:
-        return await self.s3_uploader.upload_file(file_path)
+            handler = self._handlers.get(event.event)
+            if handler:
+                async for output in handler(event):
+                    yield output
+
+    async def _handle_message_delta(self, event) -> AsyncGenerator[str, None]:
+        if event.data.delta.content:
+            text = "".join(
+                content.text.value
+                for content in event.data.delta.content
+                if content.type == "text" and content.text.value
+            )
+            if text:
+                yield text
+
+    async def _handle_step_delta(self, event) -> AsyncGenerator[str, None]:
+        if event.data.delta.step_details:
+            step_details = event.data.delta.step_details
+            if step_details.type == "tool_calls":
+                for tool_call in step_details.tool_calls:
+                    if tool_call.type == "code_interpreter":
+                        if tool_call.code_interpreter.input:
+                            yield tool_call.code_interpreter.input
+                        if tool_call.code_interpreter.outputs:
+                            for output in tool_call.code_interpreter.outputs:
+                                if output.type == "logs":
+                                    print(output.logs, end="", flush=True)
+                                else:
+                                    logger.info("Output: %s", output.value)
+
+    async def _handle_message_completed(self, event) -> AsyncGenerator[str, None]:
+        message = event.data
+        files = {}
+        for content_block in message.content:
+            if content_block.text.annotations:
+                for annotation in content_block.text.annotations:
+                    object_name = annotation.text.split("/")[-1]
+                    if annotation.type == "file_path":
+                        files.setdefault(annotation.file_path.file_id, object_name)
+                    elif annotation.type == "file":
+                        files.setdefault(annotation.file_id, object_name)
+        urls = await asyncio.gather(
+            *[
+                self._create_s3_download_url(file_id, object_name)
+                for file_id, object_name in files.items()
+            ]
+        )
+        for url in urls:
+            yield url
+
+    async def _upload_to_s3(
+        self, fileobj: Union[BinaryIO, AsyncIteratorReader], object_name: str
+    ) -> str:
+        return await self.s3_uploader.upload_fileobj(fileobj, object_name)
+
+    async def _get_cached_url(self, file_id: str) -> Optional[str]:
+        cached = self._url_cache.get(file_id)
+        if cached is None:
+            return None
+        self._url_cache.move_to_end(file_id)
+        s3_object_name, url, issued_at = cached
+        if time.monotonic() - issued_at > URL_CACHE_TTL:
+            logger.info("Refreshing presigned URL: %s", s3_object_name)
+            url = await self.s3_uploader.generate_presigned_url(s3_object_name)
+            self._cache_url(file_id, s3_object_name, url)
+        return url
+
+    def _cache_url(self, file_id: str, object_name: str, url: str) -> None:
+        self._url_cache[file_id] = (object_name, url, time.monotonic())
+        self._url_cache.move_to_end(file_id)
+        if len(self._url_cache) > URL_CACHE_SIZE:
+            self._url_cache.popitem(last=False)
 
     async def _create_s3_download_url(self, file_id: str, object_name: str) -> str:
-        file_path = Path(gettempdir()) / object_name
-        logger.info(f"Creating temporary file: {file_path}")
         try:
-            file_data = await self.client.files.content(file_id)
-            file_path.write_bytes(file_data.read())
-            s3_url = await self._upload_to_s3(str(file_path))
+            s3_url = await self._get_cached_url(file_id)
+            if not s3_url:
+                s3_object_name = f"{file_id}/{object_name}"
+                async with self._download_semaphore:
+                    logger.info("Uploading file to S3: %s", s3_object_name)
+                    async with self.client.files.with_streaming_response.content(
+                        file_id
+                    ) as response:
+                        s3_url = await self._upload_to_s3(
+                            AsyncIteratorReader(response.iter_bytes(1024 * 1024)),
+                            s3_object_name,
+                        )
+                self._cache_url(file_id, s3_object_name, s3_url)
             return f"\n\nDownload file: [{object_name}]({s3_url})\n"
         except Exception as e:
-            logger.error(f"Error handling file: {e}")
+            logger.error("Error handling file: %s", e)
             return f"\nError creating download link: {str(e)}\n"
-        finally:
-            try:
-                file_path.unlink(missing_ok=True)
-                logger.info(f"Cleaned up temporary file: {file_path}")
-            except Exception as e:
-                logger.warning(f"Failed to clean up temporary file {file_path}: {e}")
+
+    async def aclose(self) -> None:
+        await self.s3_uploader.aclose()
+        await self.client.close()
 
 
 async def main() -> None:
@@ -140,14 +198,17 @@ async def main() -> None:
         )
     assistant = OpenAIAssistant(assistant_id, thread_id, stream_tool_outputs)
     user_input = "Create a hello world python scenario"
-    while True:
-        print("Assistant: ", end="", flush=True)
-        async for message in assistant.chat(user_input):
-            print(message, end="", flush=True)
-        print("\n")
-        user_input = input("Enter your response (or 'quit' to exit): ")
-        if user_input.lower().strip() == "quit":
-            break
+    try:
+        while True:
+            print("Assistant: ", end="", flush=True)
+            async for message in assistant.chat(user_input):
+                print(message, end="", flush=True)
+            print("\n")
+            user_input = input("Enter your response (or 'quit' to exit): ")
+            if user_input.lower().strip() == "quit":
+                break
+    finally:
+        await assistant.aclose()
     print(f"Conversation ended. Final thread ID: {assistant.thread_id}")
 
 
@@ -1,14 +1,49 @@
 import asyncio
 import logging
 import os
+from contextlib import AsyncExitStack, suppress
+from functools import cache
+from typing import AsyncIterator, Awaitable, BinaryIO, Union
 
 import aioboto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
 
 logger = logging.getLogger(__name__)
 
+_SESSION = aioboto3.Session()
+_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024, multipart_chunksize=8 * 1024 * 1024
+)
+
+
+class AsyncIteratorReader:
+    def __init__(self, iterator: AsyncIterator[bytes]) -> None:
+        self._iterator = iterator
+        self._buffer = bytearray()
+        self._exhausted = False
+
+    async def read(self, size: int = -1) -> bytes:
+        while not self._exhausted and (size < 0 or len(self._buffer) < size):
+            try:
+                self._buffer += await self._iterator.__anext__()
+            except StopAsyncIteration:
+                self._exhausted = True
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+@cache
+def _get_config(region: str) -> Config:
+    return Config(signature_version="s3v4", region_name=region)
+
 
 class S3Uploader:
+    URL_EXPIRES_IN = 3600
+
     def __init__(
         self,
         aws_access_key_id: str,
@@ -16,32 +51,85 @@ class S3Uploader:
         bucket_name: str,
         region: str,
     ):
-        self.session = aioboto3.Session()
+        self.session = _SESSION
         self.aws_access_key_id = aws_access_key_id
         self.aws_secret_access_key = aws_secret_access_key
         self.bucket_name = bucket_name
-        self.aws_config = Config(signature_version="s3v4", region_name=region)
+        self.aws_config = _get_config(region)
+        self._s3_client = None
+        self._exit_stack = AsyncExitStack()
+        self._client_lock = asyncio.Lock()
+
+    async def _get_client(self):
+        async with self._client_lock:
+            if self._s3_client is None:
+                self._s3_client = await self._exit_stack.enter_async_context(
+                    self.session.client(
+                        "s3",
+                        aws_access_key_id=self.aws_access_key_id,
+                        aws_secret_access_key=self.aws_secret_access_key,
+                        config=self.aws_config,
+                    )
+                )
+            return self._s3_client
+
+    def _presign(self, s3_client, object_name: str) -> Awaitable[str]:
+        return s3_client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket_name, "Key": object_name},
+            ExpiresIn=self.URL_EXPIRES_IN,
+        )
+
+    async def _upload_and_presign(
+        self, s3_client, object_name: str, upload: Awaitable[None]
+    ) -> str:
+        url_task = asyncio.ensure_future(self._presign(s3_client, object_name))
+        try:
+            await upload
+        except BaseException:
+            url_task.cancel()
+            with suppress(Exception, asyncio.CancelledError):
+                await url_task
+            raise
+        return await url_task
+
+    async def generate_presigned_url(self, object_name: str) -> str:
+        s3_client = await self._get_client()
+        return await self._presign(s3_client, object_name)
 
     async def upload_file(self, file_path: str) -> str:
         object_name = os.path.basename(file_path)
         try:
-            async with self.session.client(
-                "s3",
-                aws_access_key_id=self.aws_access_key_id,
-                aws_secret_access_key=self.aws_secret_access_key,
-                config=self.aws_config,
-            ) as s3_client:
-                await s3_client.upload_file(file_path, self.bucket_name, object_name)
-                url = await s3_client.generate_presigned_url(
-                    "get_object",
-                    Params={"Bucket": self.bucket_name, "Key": object_name},
-                    ExpiresIn=3600,
-                )
-                return url
+            s3_client = await self._get_client()
+            return await self._upload_and_presign(
+                s3_client,
+                object_name,
+                s3_client.upload_file(file_path, self.bucket_name, object_name),
+            )
         except Exception as e:
-            logger.error(f"Failed to upload file to S3: {e}")
+            logger.error("Failed to upload file to S3: %s", e)
             raise
 
+    async def upload_fileobj(
+        self, fileobj: Union[BinaryIO, AsyncIteratorReader], object_name: str
+    ) -> str:
+        try:
+            s3_client = await self._get_client()
+            return await self._upload_and_presign(
+                s3_client,
+                object_name,
+                s3_client.upload_fileobj(
+                    fileobj, self.bucket_name, object_name, Config=_TRANSFER_CONFIG
+                ),
+            )
+        except Exception as e:
+            logger.error("Failed to upload file object to S3: %s", e)
+            raise
+
+    async def aclose(self) -> None:
+        await self._exit_stack.aclose()
+        self._s3_client = None
+
 
 async def main():
     from dotenv import load_dotenv
@@ -77,6 +165,7 @@ async def main():
         print(f"Error uploading file: {e}")
     finally:
         os.remove(test_file)
+        await uploader.aclose()
 
 
 if __name__ == "__main__":